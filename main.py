@@ -1,10 +1,21 @@
 # simpy_app.py
 
-import streamlit as st
 import re
 import sys
 import io
-import pandas as pd
+import ast
+import inspect
+import timeit
+import os
+import stat
+import marshal
+import zipfile
+import argparse
+import functools
+import importlib.abc
+import importlib.util
+import hashlib
+import simpy_runtime
 
 # Define the keyword mapping using regular expressions
 # keyword_mapping = {
@@ -114,6 +125,11 @@ keyword_mapping = {
     # Function Definition and Return
     r'\bcreate\b': 'def',
     r'\bgiveback\b': 'return',
+    r'\bproduce\b': 'yield',
+
+    # Concurrency (async functions and waiting on them)
+    r'\bconcurrent\b': 'async',
+    r'\bwaitfor\b': 'await',
 
     # Data Types
     r'\bwhole\b': 'int',
@@ -130,14 +146,34 @@ keyword_mapping = {
     r'\blessequal\b': '<=',
     r'\bnotequals\b': '!=',
 
+    # Membership Operators
+    r'\binside\b': 'in',
+
     # Logical Values
     r'\byes\b': 'True',
     r'\bno\b': 'False',
 
     # Built-in Functions
     r'\bdisplay\b': 'print',
+
+    # Lazy Built-in Functions (produce values one at a time)
+    r'\bseries\b': 'range',
+    r'\bapply\b': 'map',
+    r'\bselect\b': 'filter',
 }
 
+# Builtins provided by simpy_runtime. They keep their names: the compiler
+# imports the ones a program uses into the program's own globals (see
+# link_simpy_runtime), so `total = 0` only rebinds `total` for that program.
+runtime_builtins = [
+    # Vectors (NumPy arrays) and reductions
+    'vector', 'total', 'maximum', 'minimum', 'average',
+    # File Input and Output
+    'access', 'eachline', 'eachchunk', 'mapfile', 'writeall',
+    # Concurrency (waiting on many calls at once)
+    'together',
+]
+
 
 # simpy_keywords = [
 #     'check', 'also', 'otherwise', 'loopwhile', 'repeat', 'break', 'continue',
@@ -155,7 +191,10 @@ simpy_keywords = [
     'check', 'also', 'otherwise', 'loopwhile', 'repeat',
     'create', 'giveback', 'whole', 'decimal', 'text', 'array', 'map',
     'equals', 'greater', 'less', 'yes', 'no', 'display', 'greaterequal', 'lessequal',
-    'notequals',
+    'notequals', 'vector', 'total', 'maximum', 'minimum', 'average',
+    'inside', 'parallel', 'remember', 'produce', 'series', 'apply', 'select',
+    'access', 'eachline', 'eachchunk', 'mapfile', 'writeall',
+    'concurrent', 'waitfor', 'together',
 ]
 
 # Token specification
@@ -174,6 +213,28 @@ token_specification = [
 token_regex = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_specification)
 compiled_regex = re.compile(token_regex)
 
+# Function to tokenize a single line of Simpy code
+# Returns (type, value, column) tuples; comments and whitespace are skipped.
+# The combined regex tries the alternatives in token_specification order,
+# so the first pattern that matches wins, as in the original per-pattern loop.
+def tokenize_simpy_line(line):
+    line_tokens = []
+    position = 0
+    while position < len(line):
+        match = compiled_regex.match(line, position)
+        if not match:
+            # Handle error or skip character
+            position += 1
+            continue
+        token_type = match.lastgroup
+        value = match.group(0)
+        if token_type != 'SKIP' and token_type != 'COMMENT':
+            if token_type == 'IDENTIFIER' and value in simpy_keywords:
+                token_type = 'KEYWORD'
+            line_tokens.append((token_type, value, position))
+        position = match.end()
+    return line_tokens
+
 # Function to tokenize Simpy code
 def tokenize_simpy_code(simpy_code):
     tokens = []
@@ -181,62 +242,751 @@ def tokenize_simpy_code(simpy_code):
     identifier_count = 0
 
     for line_num, line in enumerate(lines, 1):
-        position = 0
-        while position < len(line):
-            match = None
-            for token_type, pattern in token_specification:
-                regex = re.compile(pattern)
-                match = regex.match(line, position)
-                if match:
-                    value = match.group(0)
-                    if token_type == 'SKIP' or token_type == 'COMMENT':
-                        position = match.end()
-                        break
-                    elif token_type == 'IDENTIFIER' and value in simpy_keywords:
-                        token_type = 'KEYWORD'
-
-                    # Generate unique identifier for each token
-                    identifier_count += 1
-                    token_id = f"T{identifier_count}"
-
-                    tokens.append({
-                    'id': token_id,
-                    'type': token_type,
-                    'value': value,
-                    'line': line_num
-                    })
-                    position = match.end()
-                    break
-            if not match:
-                # Handle error or skip character
-                position += 1
+        for token_type, value, _ in tokenize_simpy_line(line):
+            # Generate unique identifier for each token
+            identifier_count += 1
+            token_id = f"T{identifier_count}"
+
+            tokens.append({
+            'id': token_id,
+            'type': token_type,
+            'value': value,
+            'line': line_num
+            })
 
     return tokens
 
+# Function to compile one regex that matches every Simpy keyword
+# Each keyword becomes a named group k0, k1, ... in the order given.
+# String literals are matched first and kept as they are, so "inside.txt"
+# stays "inside.txt"; a keyword right after a `.` is an attribute name
+# (df.apply), so it is not matched either.
+@functools.lru_cache(maxsize=8)
+def compile_keyword_regex(sorted_keywords):
+    return re.compile('|'.join(
+        [f'(?P<string>{string_literal_regex})']
+        + [f'(?<!\\.)(?P<k{index}>{simpy_keyword})' for index, (simpy_keyword, _) in enumerate(sorted_keywords)]
+    ))
+
+# A string literal with its prefix: triple-quoted, or quoted on one line
+string_literal_regex = (
+    r'(?<!\w)[rRbBuUfF]{0,2}'
+    r'(?:"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')'
+)
+
+# Replacement fields of an f-string, and the doubled braces that are not
+replacement_field_regex = re.compile(r'\{\{|\}\}|\{[^{}]*\}')
+
+# Function to replace every Simpy keyword in a single pass
+# Replacements are never translated again, so e.g. `apply` becomes `map` and
+# does not go on to become `dict`. Returns the code and the matched keywords.
+def replace_simpy_keywords(simpy_code):
+    # Sort the keywords by length in descending order to prevent partial replacements
+    sorted_keywords = tuple(sorted(keyword_mapping.items(), key=lambda x: len(x[0]), reverse=True))
+    keyword_regex = compile_keyword_regex(sorted_keywords)
+    matches = []
+
+    def replace_field(field):
+        if field.group(0) in ('{{', '}}'):
+            return field.group(0)
+        return keyword_regex.sub(replace, field.group(0))
+
+    def replace(match):
+        if match.lastgroup == 'string':
+            literal = match.group(0)
+            # Only the expressions in an f-string's {replacement fields} are code
+            prefix = literal[:len(literal) - len(literal.lstrip('rRbBuUfF'))]
+            if 'f' in prefix.lower():
+                return prefix + replacement_field_regex.sub(replace_field, literal[len(prefix):])
+            return literal
+        index = int(match.lastgroup[1:])
+        matches.append((index, match.group(0)))
+        return sorted_keywords[index][1]
+
+    python_code = keyword_regex.sub(replace, simpy_code)
+    return python_code, [(sorted_keywords[index][1], value) for index, value in sorted(matches, key=lambda item: item[0])]
+
 # Function to translate Simpy code to Python code with explanations
 def translate_simpy_to_python_with_explanation(simpy_code):
     explanations = []
-    python_code = simpy_code  # Start with the original code
-    # Sort the keywords by length in descending order to prevent partial replacements
-    sorted_keywords = sorted(keyword_mapping.items(), key=lambda x: len(x[0]), reverse=True)
-    for simpy_keyword, python_keyword in sorted_keywords:
-        # Find all occurrences of the Simpy keyword
-        matches = re.findall(simpy_keyword, python_code)
-        for match in matches:
-            # Explain the replacement
-            explanation = f"Replacing `{match}` with `{python_keyword}`"
-            explanations.append(explanation)
-        # Replace the Simpy keyword with the Python keyword
-        python_code = re.sub(simpy_keyword, python_keyword, python_code)
+    python_code, matches = replace_simpy_keywords(simpy_code)
+    for python_keyword, match in matches:
+        # Explain the replacement
+        explanation = f"Replacing `{match}` with `{python_keyword}`"
+        explanations.append(explanation)
+    python_code = rewrite_simpy_headers(python_code, explanations)
     return python_code, explanations
 
 # Function to translate Simpy code to Python code
 def translate_simpy_to_python(simpy_code):
-    # Sort the keywords by length in descending order to prevent partial replacements
-    sorted_keywords = sorted(keyword_mapping.items(), key=lambda x: len(x[0]), reverse=True)
-    for simpy_keyword, python_keyword in sorted_keywords:
-        simpy_code = re.sub(simpy_keyword, python_keyword, simpy_code)
-    return simpy_code
+    python_code, _ = replace_simpy_keywords(simpy_code)
+    return rewrite_simpy_headers(python_code)
+
+
+# Header of a parallel loop after keyword translation, e.g.
+#   repeat parallel x inside items workers 4 into scores:
+#   for parallel x in items workers 4 into scores:
+parallel_loop_regex = re.compile(
+    r'^(?P<indent>[ \t]*)for[ \t]+parallel[ \t]+(?P<target>.+?)[ \t]+in[ \t]+(?P<items>.+?)'
+    r'(?:[ \t]+workers[ \t]+(?P<workers>\w+))?(?:[ \t]+into[ \t]+(?P<into>\w+))?'
+    r'[ \t]*:(?P<rest>[ \t]*(?:#.*)?)$',
+    re.MULTILINE,
+)
+
+# Function to rewrite a parallel loop header into a plain `for` over
+# simpy_runtime.parallel(...); ParallelLoopTransformer then turns the loop
+# into a call that runs the body on a process pool
+def rewrite_parallel_loop_header(match):
+    options = [match.group('items'), f"workers={match.group('workers') or None}"]
+    if match.group('into'):
+        options.append(f"into={match.group('into')!r}")
+    return f"{match.group('indent')}for {match.group('target')} in simpy_runtime.parallel({', '.join(options)}):{match.group('rest')}"
+
+# Header of a remembered function after keyword translation, e.g.
+#   remember(500) create fib(n) -> whole: giveback ...
+#   remember(500) def fib(n) -> int: return ...
+# The return annotation and a body on the same line are both optional.
+remember_function_regex = re.compile(
+    r'^(?P<indent>[ \t]*)remember(?:[ \t]*\((?P<size>[^)]*)\))?[ \t]+def[ \t]+(?P<signature>.+?\))'
+    r'(?:[ \t]*->[ \t]*(?P<returns>[^:]+?))?[ \t]*:(?P<rest>.*)$',
+    re.MULTILINE,
+)
+
+# Function to rewrite a remembered function header, keeping it on one line
+# A decorator would need a line of its own, so the cache goes into the return
+# annotation, wrapping the function's own annotation if it has one:
+#   def fib(n) -> simpy_runtime.remember(500)[int]:
+# RememberTransformer moves the cache to the decorator list and puts the
+# function's annotation back.
+def rewrite_remember_header(match):
+    cache = f"simpy_runtime.remember({match.group('size') or ''})"
+    if match.group('returns'):
+        cache += f"[{match.group('returns')}]"
+    return f"{match.group('indent')}def {match.group('signature')} -> {cache}:{match.group('rest')}"
+
+# Headers rewritten after keyword translation: (regex, rewrite, explanation)
+header_rewrites = [
+    (parallel_loop_regex, rewrite_parallel_loop_header,
+     "Running the `repeat parallel` loop on line {line_num} on a pool of worker processes"),
+    (remember_function_regex, rewrite_remember_header,
+     "Caching the results of the `remember` function on line {line_num}"),
+]
+
+# Function to rewrite Simpy headers that are more than a keyword swap
+# Each rewrite stays on its line, so line numbers still match the Simpy code.
+def rewrite_simpy_headers(python_code, explanations=None):
+    for regex, rewrite, explanation in header_rewrites:
+        if explanations is not None:
+            for match in regex.finditer(python_code):
+                explanations.append(explanation.format(line_num=python_code.count('\n', 0, match.start()) + 1))
+        python_code = regex.sub(rewrite, python_code)
+    return python_code
+
+
+# Type conversions the optimizer may evaluate at translation time when every
+# argument is a constant (whole, decimal, text and flag after translation)
+foldable_conversions = {'int': int, 'float': float, 'str': str, 'bool': bool}
+
+# Optimization pass over the translated program's AST
+# Folds constant type conversions and arithmetic, and drops branches whose
+# condition is always yes or no. Replacement nodes take the location of the
+# node they replace, so error line numbers still match the Simpy code.
+class SimpyOptimizer(ast.NodeTransformer):
+    def __init__(self, rebound_names):
+        self.rebound_names = rebound_names
+        self.loop_depth = 0
+        self.in_function = False
+        self.report = []
+
+    def fold(self, node, value):
+        folded = ast.copy_location(ast.Constant(value), node)
+        # A signed literal such as -5 is a unary minus in the AST; folding it
+        # lets e.g. 3 - -5 fold too, but is not worth reporting
+        signed_number = (isinstance(node, ast.UnaryOp)
+                         and isinstance(node.op, (ast.UAdd, ast.USub))
+                         and type(node.operand.value) in (int, float, complex))
+        if signed_number or ast.unparse(folded) == ast.unparse(node):
+            return folded
+        where = " inside a loop, now evaluated once instead of every iteration" if self.loop_depth else ""
+        self.report.append((node.lineno, f"folded `{ast.unparse(node)}` into `{ast.unparse(folded)}`{where}"))
+        return folded
+
+    def evaluate(self, node):
+        # Refuse operations whose result could be huge, e.g. 10 ** 10 ** 10 or "a" * 10 ** 9
+        if isinstance(node, ast.BinOp):
+            left, right = node.left.value, node.right.value
+            if isinstance(node.op, (ast.Pow, ast.LShift)) and isinstance(right, int) and abs(right) > 64:
+                return node
+            if isinstance(node.op, ast.Mult) and isinstance(left, (str, bytes)) != isinstance(right, (str, bytes)):
+                return node
+        try:
+            value = eval(compile(ast.fix_missing_locations(ast.Expression(node)), '<simpy>', 'eval'), {'__builtins__': {}})
+        except Exception:
+            return node
+        return self.fold(node, value)
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if (isinstance(node.func, ast.Name)
+                and node.func.id in foldable_conversions
+                and node.func.id not in self.rebound_names
+                and not node.keywords
+                and all(isinstance(arg, ast.Constant) for arg in node.args)):
+            try:
+                value = foldable_conversions[node.func.id](*(arg.value for arg in node.args))
+            except Exception:
+                return node
+            return self.fold(node, value)
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant):
+            return self.evaluate(node)
+        return node
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.operand, ast.Constant):
+            return self.evaluate(node)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if all(isinstance(operand, ast.Constant) for operand in [node.left] + node.comparators):
+            return self.evaluate(node)
+        return node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        if all(isinstance(value, ast.Constant) for value in node.values):
+            return self.evaluate(node)
+        return node
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.test, ast.Constant):
+            kept, dead = (node.body, node.orelse) if node.test.value else (node.orelse, node.body)
+            if self.changes_scope([dead]):
+                return node
+            self.report.append((node.lineno, f"condition is always {'yes' if node.test.value else 'no'}, kept only `{ast.unparse(kept)}`"))
+            return kept
+        return node
+
+    # Even code that never runs decides what the compiler makes of a function
+    # or program: `produce` makes a generator, `waitfor` a coroutine, and an
+    # assignment makes a name local to the function. Such dead code is kept.
+    def changes_scope(self, dead):
+        pending = list(dead)
+        while pending:
+            node = pending.pop()
+            if isinstance(node, (ast.Yield, ast.YieldFrom, ast.Await, ast.AsyncFor, ast.AsyncWith, ast.Global, ast.Nonlocal)):
+                return True
+            if self.in_function and (
+                    (isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load))
+                    or isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.alias))):
+                return True
+            # What happens inside a nested function or class belongs to its own scope
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                pending.extend(ast.iter_child_nodes(node))
+        return False
+
+    def drop_branch(self, node, kept, dead, statement):
+        if self.changes_scope(dead):
+            return node
+        self.report.append((node.lineno, f"condition is always {'yes' if node.test.value else 'no'}, removed the dead `{statement}` branch"))
+        return kept or ast.copy_location(ast.Pass(), node)
+
+    def visit_If(self, node):
+        self.generic_visit(node)
+        if isinstance(node.test, ast.Constant):
+            kept, dead = (node.body, node.orelse) if node.test.value else (node.orelse, node.body)
+            return self.drop_branch(node, kept, dead, 'check')
+        return node
+
+    def visit_While(self, node):
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+        if isinstance(node.test, ast.Constant) and not node.test.value:
+            return self.drop_branch(node, node.orelse, node.body, 'loopwhile')
+        return node
+
+    # Track whether the code being optimized runs in a function's scope
+    def visit_scope(self, node, in_function):
+        outer, self.in_function = self.in_function, in_function
+        self.generic_visit(node)
+        self.in_function = outer
+        return node
+
+    def visit_FunctionDef(self, node):
+        return self.visit_scope(node, True)
+
+    visit_AsyncFunctionDef = visit_Lambda = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        return self.visit_scope(node, False)
+
+    def visit_For(self, node):
+        node.iter = self.visit(node.iter)
+        self.loop_depth += 1
+        node.body = [result for statement in node.body for result in self.visit_statement(statement)]
+        self.loop_depth -= 1
+        node.orelse = [result for statement in node.orelse for result in self.visit_statement(statement)]
+        return node
+
+    def visit_statement(self, statement):
+        result = self.visit(statement)
+        if result is None:
+            return []
+        return result if isinstance(result, list) else [result]
+
+
+# Function to collect every name the program binds, so conversions such as
+# int() are only folded when the program has not redefined them
+def collect_rebound_names(tree):
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.alias):
+            names.add((node.asname or node.name).split('.')[0])
+    return names
+
+# Function to optimize translated Python code
+# Returns the optimized AST and a list of report lines, one per optimization.
+def optimize_python_code(python_code, filename='<simpy>'):
+    tree = parse_python_code(python_code, filename)
+    optimizer = SimpyOptimizer(collect_rebound_names(tree))
+    tree = ast.fix_missing_locations(optimizer.visit(tree))
+    report = [f"Line {line_num}: {message}" for line_num, message in sorted(optimizer.report, key=lambda item: item[0])]
+    return tree, report
+
+# Function to import simpy_runtime into programs that use it
+# Runtime builtins the program mentions are imported by name (`from
+# simpy_runtime import total`) and compiler-generated code gets `import
+# simpy_runtime`. The imports go after a leading docstring and any
+# `from __future__` imports, and take line 1's location so no line shifts.
+def link_simpy_runtime(tree):
+    names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    imports = []
+    if 'simpy_runtime' in names:
+        imports.append(ast.Import(names=[ast.alias(name='simpy_runtime')]))
+    used_builtins = [name for name in runtime_builtins if name in names]
+    if used_builtins:
+        imports.append(ast.ImportFrom(module='simpy_runtime', names=[ast.alias(name=name) for name in used_builtins], level=0))
+    position = 0
+    if tree.body and isinstance(tree.body[0], ast.Expr) and isinstance(tree.body[0].value, ast.Constant) \
+            and isinstance(tree.body[0].value.value, str):
+        position = 1
+    while position < len(tree.body) and isinstance(tree.body[position], ast.ImportFrom) \
+            and tree.body[position].module == '__future__':
+        position += 1
+    for runtime_import in reversed(imports):
+        tree.body.insert(position, ast.fix_missing_locations(ast.copy_location(runtime_import, ast.Pass(lineno=1, col_offset=0))))
+    return tree
+
+# Methods that change a collection in place; calling one on an outer variable
+# in a parallel loop body would only change the worker process's copy
+mutating_methods = {
+    'append', 'extend', 'insert', 'remove', 'pop', 'clear', 'update',
+    'add', 'discard', 'setdefault', 'sort', 'reverse',
+}
+
+# Function to collect the names a block of statements binds in its own scope
+# Nested functions, classes, lambdas and comprehensions have scopes of their
+# own, so only their names count, not what happens inside them.
+def scope_bound_names(statements, skip=()):
+    skipped = {id(statement) for statement in skip}
+    names = set()
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if id(node) in skipped:
+            continue
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            continue
+        elif isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            continue
+        elif isinstance(node, ast.alias):
+            names.add((node.asname or node.name).split('.')[0])
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        pending.extend(ast.iter_child_nodes(node))
+    return names
+
+# Function to give generated nodes the location of the Simpy line they came from
+def relocate(new_node, old_node):
+    for node in ast.walk(new_node):
+        if 'lineno' in node._attributes:
+            node.lineno = node.end_lineno = old_node.lineno
+            node.col_offset = node.end_col_offset = old_node.col_offset
+    return new_node
+
+# Rewrites the body of a parallel loop so it can run as a function:
+# `continue` becomes `giveback` (return None) and `break` is rejected
+class ParallelBodyRewriter(ast.NodeTransformer):
+    def __init__(self, transformer):
+        self.transformer = transformer
+
+    def visit_Continue(self, node):
+        return ast.copy_location(ast.Return(value=None), node)
+
+    def visit_Break(self, node):
+        raise self.transformer.error(node, "`break` cannot stop a `repeat parallel` loop: all items are handed to the workers up front.")
+
+    # Nested loops and functions own their break, continue and giveback
+    def visit_For(self, node):
+        return node
+
+    visit_While = visit_AsyncFor = visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = visit_Lambda = visit_For
+
+# Rewrites loops over simpy_runtime.parallel(...) (see rewrite_parallel_loop_header)
+# into a body function and a process pool call, both on the loop's line:
+#   def _simpy_parallel_body_<line>(x):
+#       <body>
+#   scores = simpy_runtime.run_parallel(_simpy_parallel_body_<line>, items, workers)
+class ParallelLoopTransformer(ast.NodeTransformer):
+    def __init__(self, filename):
+        self.filename = filename
+        self.scopes = []
+
+    def error(self, node, message):
+        return SyntaxError(f"Line {node.lineno}: {message}", (self.filename, node.lineno, node.col_offset + 1, None))
+
+    def visit_scope(self, node):
+        self.scopes.append(node)
+        self.generic_visit(node)
+        self.scopes.pop()
+        return node
+
+    visit_Module = visit_FunctionDef = visit_AsyncFunctionDef = visit_scope
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        call = node.iter
+        if not (isinstance(call, ast.Call)
+                and isinstance(call.func, ast.Attribute)
+                and isinstance(call.func.value, ast.Name)
+                and call.func.value.id == 'simpy_runtime'
+                and call.func.attr == 'parallel'):
+            return node
+        self.check_body(node)
+
+        options = {keyword.arg: keyword.value for keyword in call.keywords}
+        function_name = f"_simpy_parallel_body_{node.lineno}"
+        if isinstance(node.target, ast.Name):
+            function = relocate(ast.parse(f"def {function_name}({node.target.id}): pass").body[0], node)
+            function.body = []
+        else:
+            function = relocate(ast.parse(f"def {function_name}(_simpy_item): pass").body[0], node)
+            function.body = [relocate(ast.Assign(targets=[node.target], value=ast.Name('_simpy_item', ast.Load())), node)]
+        rewriter = ParallelBodyRewriter(self)
+        function.body += [rewriter.visit(statement) for statement in node.body]
+
+        into = options.get('into')
+        target = f"{into.value} = " if isinstance(into, ast.Constant) and into.value else ""
+        run = relocate(ast.parse(f"{target}simpy_runtime.run_parallel({function_name}, None, None)").body[0], node)
+        run.value.args[1:] = [call.args[0], options.get('workers') or relocate(ast.Constant(None), node)]
+        return [function, run] + node.orelse
+
+    # Each item runs in its own worker process, so changes the body makes to
+    # outer variables would be silently lost; refuse them with a clear error
+    def check_body(self, node):
+        loop_names = scope_bound_names([node.target])
+        body_names = scope_bound_names(node.body) | loop_names
+        scope = self.scopes[-1]
+        outer_statements = [scope.args] + scope.body if isinstance(scope, (ast.FunctionDef, ast.AsyncFunctionDef)) else scope.body
+        outer_names = scope_bound_names(outer_statements, skip=node.body) - loop_names
+        advice = ("Each item runs in a separate worker process, so the change would be lost. "
+                  "Use `giveback` to send a value back and `into` to collect the results in order.")
+
+        pending = list(node.body)
+        while pending:
+            child = pending.pop()
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                continue
+            if isinstance(child, (ast.Global, ast.Nonlocal)):
+                raise self.error(child, f"`repeat parallel` body declares `{', '.join(child.names)}` as outer variables. {advice}")
+            if isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load) and child.id in outer_names:
+                raise self.error(child, f"`repeat parallel` body assigns to the outer variable `{child.id}`. {advice}")
+            if isinstance(child, (ast.Subscript, ast.Attribute)) and not isinstance(child.ctx, ast.Load):
+                base = child.value
+                while isinstance(base, (ast.Subscript, ast.Attribute)):
+                    base = base.value
+                if isinstance(base, ast.Name) and base.id not in body_names:
+                    raise self.error(child, f"`repeat parallel` body changes the outer variable `{base.id}`. {advice}")
+            if (isinstance(child, ast.Call)
+                    and isinstance(child.func, ast.Attribute)
+                    and child.func.attr in mutating_methods
+                    and isinstance(child.func.value, ast.Name)
+                    and child.func.value.id in outer_names - body_names):
+                raise self.error(child, f"`repeat parallel` body changes the outer variable `{child.func.value.id}` with `{child.func.attr}`. {advice}")
+            pending.extend(ast.iter_child_nodes(child))
+
+# Moves the cache from the return annotation of a remembered function
+# (see rewrite_remember_header) to its decorator list
+class RememberTransformer(ast.NodeTransformer):
+    def visit_FunctionDef(self, node):
+        self.generic_visit(node)
+        cache, returns = node.returns, None
+        if isinstance(cache, ast.Subscript):
+            cache, returns = cache.value, cache.slice
+        if (isinstance(cache, ast.Call)
+                and isinstance(cache.func, ast.Attribute)
+                and isinstance(cache.func.value, ast.Name)
+                and cache.func.value.id == 'simpy_runtime'
+                and cache.func.attr == 'remember'):
+            node.decorator_list.insert(0, cache)
+            node.returns = returns
+        return node
+
+# Function to parse translated Simpy code
+# A `remember` the header rewrite could not handle (e.g. before `concurrent
+# create`) would otherwise be reported as a bare "invalid syntax".
+def parse_python_code(python_code, filename='<simpy>'):
+    try:
+        return ast.parse(python_code, filename)
+    except SyntaxError as e:
+        if e.text and re.match(r'[ \t]*remember\b', e.text):
+            raise SyntaxError(
+                f"Line {e.lineno}: `remember` must come right before `create name(...):`, "
+                f"e.g. `remember(100) create fib(n):` (it cannot be used with `concurrent create`)",
+                (filename, e.lineno, 1, e.text),
+            ) from None
+        raise
+
+# Function to translate and compile Simpy code, optionally optimized
+# Returns the code object and the optimization report.
+# Programs may use `waitfor` at the top level (top_level_await); such code
+# compiles to a coroutine and is run with execute_simpy_code().
+def compile_simpy_code(simpy_code, optimize=False, filename='<simpy>', top_level_await=True):
+    return compile_python_code(translate_simpy_to_python(simpy_code), optimize, filename, top_level_await)
+
+# Function to compile translated Simpy code, optionally optimized
+# Also used by the language server, which translates documents line by line.
+def compile_python_code(python_code, optimize=False, filename='<simpy>', top_level_await=True):
+    if optimize:
+        tree, report = optimize_python_code(python_code, filename)
+    else:
+        tree, report = parse_python_code(python_code, filename), []
+    tree = RememberTransformer().visit(tree)
+    tree = ast.fix_missing_locations(ParallelLoopTransformer(filename).visit(tree))
+    link_simpy_runtime(tree)
+    flags = ast.PyCF_ALLOW_TOP_LEVEL_AWAIT if top_level_await else 0
+    return compile(tree, filename, 'exec', flags=flags), report
+
+# Function to execute compiled Simpy code
+# A program that uses `waitfor` outside a function compiles to a coroutine;
+# it is driven to completion on a new event loop. file_root confines the
+# program's file builtins to one folder for this execution only. Passing an
+# unhashable argument to a `remember` function is reported in Simpy terms.
+def execute_simpy_code(code, program_globals, file_root=None):
+    token = simpy_runtime.set_file_root(file_root)
+    try:
+        if code.co_flags & inspect.CO_COROUTINE:
+            # Imported here: asyncio takes longer to import than the rest of the translator
+            import asyncio
+            asyncio.run(eval(code, program_globals))
+        else:
+            exec(code, program_globals)
+    except TypeError as e:
+        explained = simpy_runtime.explain_unhashable_argument(e)
+        if explained is None:
+            raise
+        raise explained.with_traceback(e.__traceback__) from None
+    finally:
+        simpy_runtime.file_root.reset(token)
+
+# Bump whenever a change to the translator changes the Python it produces,
+# so bytecode cached by the import hook is recompiled
+simpy_dialect_version = 11
+
+# Function to fingerprint the Simpy dialect (keyword mapping and translator)
+def simpy_dialect_fingerprint():
+    dialect = repr((simpy_dialect_version, sorted(keyword_mapping.items()), runtime_builtins))
+    return hashlib.sha256(dialect.encode('utf-8')).digest()[:16]
+
+# Import hook: lets Simpy programs `import foo` to load foo.simpy
+# The finder looks for <name>.simpy on the search path (sys.path by default)
+# only when a module is first imported, so modules are translated lazily.
+class SimpyModuleFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, search_path=None):
+        self.search_path = search_path
+
+    def find_spec(self, fullname, path, target=None):
+        name = fullname.rpartition('.')[2]
+        for directory in path or self.search_path or sys.path:
+            source_path = os.path.join(directory or os.curdir, name + '.simpy')
+            if os.path.isfile(source_path):
+                loader = SimpyModuleLoader(fullname, source_path)
+                spec = importlib.util.spec_from_file_location(fullname, source_path, loader=loader)
+                spec.cached = loader.cache_path
+                return spec
+        return None
+
+# Loader for .simpy modules
+# Bytecode is cached in __pycache__/<name>.<tag>.simpyc next to the source. The
+# cache header holds the Python magic number, the dialect fingerprint and a hash
+# of the source, so a module is only re-translated when one of them changes.
+class SimpyModuleLoader(importlib.abc.Loader):
+    def __init__(self, fullname, source_path):
+        self.fullname = fullname
+        self.source_path = source_path
+        directory, filename = os.path.split(source_path)
+        name = os.path.splitext(filename)[0]
+        self.cache_path = os.path.join(directory, '__pycache__', f"{name}.{sys.implementation.cache_tag}.simpyc")
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        exec(self.get_code(self.fullname), module.__dict__)
+
+    def get_code(self, fullname):
+        with open(self.source_path, 'rb') as source_file:
+            source = source_file.read()
+        header = importlib.util.MAGIC_NUMBER + simpy_dialect_fingerprint() + hashlib.sha256(source).digest()[:16]
+
+        try:
+            with open(self.cache_path, 'rb') as cache_file:
+                cached = cache_file.read()
+            if cached[:len(header)] == header:
+                return marshal.loads(cached[len(header):])
+        except (OSError, ValueError, EOFError, TypeError):
+            pass
+
+        # Importing never runs an event loop, so modules only `waitfor` inside functions
+        code, _ = compile_simpy_code(source.decode('utf-8'), filename=self.source_path, top_level_await=False)
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            # Write to a temporary file first so a concurrent import never reads half a cache
+            temporary_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(temporary_path, 'wb') as cache_file:
+                cache_file.write(header + marshal.dumps(code))
+            os.replace(temporary_path, self.cache_path)
+        except OSError:
+            # A read-only source directory just means no cache
+            pass
+        return code
+
+# Function to install the .simpy import hook (once)
+def install_simpy_importer(search_path=None):
+    for finder in sys.meta_path:
+        if isinstance(finder, SimpyModuleFinder):
+            return finder
+    finder = SimpyModuleFinder(search_path)
+    sys.meta_path.append(finder)
+    return finder
+
+# Function to run a Simpy file the way `python file.py` runs a script
+# file_root confines the program's file builtins to one folder.
+def run_simpy_file(path, optimize=False, file_root=None):
+    with open(path, encoding='utf-8') as simpy_file:
+        code, _ = compile_simpy_code(simpy_file.read(), optimize, path)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    install_simpy_importer()
+    execute_simpy_code(code, {'__name__': '__main__', '__file__': path}, file_root)
+
+# __main__ of a packaged program whose entry file uses top-level `waitfor`
+async_bootstrap = """
+import asyncio, marshal, os
+program = marshal.loads(__loader__.get_data(os.path.join(os.path.dirname(__file__), '__simpy_main__.bin')))
+asyncio.run(eval(program, globals()))
+"""
+
+# Function to package a Simpy program into a runnable .pyz zipapp
+# Every Simpy file is translated and compiled ahead of time and stored as
+# bytecode only (entry file as __main__.pyc, modules as <name>.pyc), so
+# starting the program never imports the translator, Streamlit or pandas.
+# simpy_runtime is bundled the same way when a module needs it.
+# Bytecode is tied to the Python version that built the archive.
+def package_simpy_program(entry_path, output_path, module_paths=(), optimize=False):
+    sources = [('__main__', entry_path)]
+    for module_path in module_paths:
+        module_name = os.path.splitext(os.path.basename(module_path))[0]
+        if not module_name.isidentifier():
+            raise ValueError(f"Cannot package {module_path}: `{module_name}` is not a valid module name")
+        sources.append((module_name, module_path))
+
+    compiled = {}
+    for module_name, path in sources:
+        with open(path, encoding='utf-8') as simpy_file:
+            compiled[module_name], _ = compile_simpy_code(simpy_file.read(), optimize, path, module_name == '__main__')
+    if any('simpy_runtime' in code.co_names for code in compiled.values()):
+        runtime_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'simpy_runtime.py')
+        with open(runtime_path, encoding='utf-8') as runtime_file:
+            compiled['simpy_runtime'] = compile(runtime_file.read(), 'simpy_runtime.py', 'exec')
+
+    # A coroutine cannot be run as a module, so an entry file with top-level
+    # `waitfor` is stored as data and started by a small bootstrap
+    if compiled['__main__'].co_flags & inspect.CO_COROUTINE:
+        data = {'__simpy_main__.bin': marshal.dumps(compiled['__main__'])}
+        compiled['__main__'] = compile(async_bootstrap, '__main__.py', 'exec')
+    else:
+        data = {}
+
+    with open(output_path, 'wb') as archive_file:
+        archive_file.write(b'#!/usr/bin/env python3\n')
+        with zipfile.ZipFile(archive_file, 'w') as archive:
+            for module_name, code in compiled.items():
+                # Timestamp-based .pyc header; with no source in the archive it is never revalidated
+                header = importlib.util.MAGIC_NUMBER + bytes(12)
+                archive.writestr(module_name + '.pyc', header + marshal.dumps(code))
+            for name, contents in data.items():
+                archive.writestr(name, contents)
+    os.chmod(output_path, os.stat(output_path).st_mode | stat.S_IEXEC)
+
+# Sample programs the benchmark skips: they start worker processes, open
+# sockets and sleep, or write files, none of which belongs in a timing loop
+benchmark_skipped_samples = {"Parallel Loop Example", "File Example", "Async Example"}
+
+# Seconds each benchmark timing runs for at least
+benchmark_duration = 0.05
+
+# Function to time a program, doubling the number of runs until they take
+# benchmark_duration (like timeit's autorange, which takes 0.2 seconds)
+# Returns the seconds per run.
+def time_per_run(run):
+    timer = timeit.Timer(run)
+    runs = 1
+    while True:
+        seconds = timer.timeit(runs)
+        if seconds >= benchmark_duration:
+            return seconds / runs
+        runs *= 2
+
+# Function to time the CPU-only sample programs with and without the optimizer
+# Each program is run repeatedly (see time_per_run), so quick and slow
+# samples are both timed reliably.
+def benchmark_sample_programs():
+    rows = []
+    for name, simpy_code in sample_programs.items():
+        if name in benchmark_skipped_samples:
+            continue
+        timings = []
+        for optimize in (False, True):
+            code, _ = compile_simpy_code(simpy_code, optimize)
+            old_stdout = sys.stdout
+            sys.stdout = io.StringIO()
+            try:
+                timings.append(time_per_run(lambda: execute_simpy_code(code, {})))
+            finally:
+                sys.stdout = old_stdout
+        rows.append({
+            "Program": name,
+            "Plain (ms per run)": round(timings[0] * 1000, 3),
+            "Optimized (ms per run)": round(timings[1] * 1000, 3),
+            "Speedup": f"{timings[0] / timings[1]:.2f}x",
+        })
+    return rows
 
 
 sample_programs = {
@@ -294,7 +1044,128 @@ check a less b:
 also a equals b:
     display("a equals b")
 otherwise:
-    display("a is greater than b")'''
+    display("a is greater than b")''',
+
+    "Optimizer Example": '''# Run with "Optimize" ticked to fold the constants below
+counter = 0
+area = 0
+
+loopwhile counter less 1000:
+    area = area + decimal(3.14) * whole(2) * whole(2)
+    check no:
+        display("Debug:", counter)
+    counter = counter + 1
+
+display("Total area:", area)''',
+
+    "Vector Example": '''prices = vector([12.5, 8.0, 23.75, 4.2, 15.0])
+
+# Elementwise arithmetic on the whole vector
+with_tax = prices * 1.2
+display("With tax:", with_tax)
+
+# Comparisons give a boolean mask that selects elements
+expensive = prices greater 10
+display("Expensive:", prices[expensive])
+display("How many:", total(expensive))
+
+display("Total:", total(prices), "Average:", average(prices))
+display("Cheapest:", minimum(prices), "Dearest:", maximum(prices))''',
+
+    "Parallel Loop Example": '''create score(n):
+    acc = 0
+    repeat i inside range(n):
+        acc = acc + i * i % 7
+    giveback acc
+
+sizes = [400000, 300000, 200000, 100000]
+
+# Each size is scored in its own worker process
+repeat parallel n inside sizes workers 4 into scores:
+    display("Scoring", n)
+    giveback score(n)
+
+display("Scores in order:", scores)''',
+
+    "Remember Example": '''# Without remember, fib(80) would take longer than the age of the universe
+remember create fib(n):
+    check n less 2:
+        giveback n
+    giveback fib(n - 1) + fib(n - 2)
+
+display("fib(80) =", fib(80))
+display(fib.stats())
+
+fib.forget()
+display("After forget:", fib.stats())''',
+
+    "Lazy Pipeline Example": '''create squares():
+    n = 0
+    loopwhile yes:
+        produce n * n
+        n = n + 1
+
+create is_even(x):
+    giveback x % 2 equals 0
+
+create halve(x):
+    giveback x // 2
+
+# squares() never ends, but each stage only computes the next value on demand
+pipeline = select(is_even, apply(halve, squares()))
+
+repeat value inside pipeline:
+    check value greater 100:
+        break
+    display(value)
+
+display("Sum of the first million:", total(series(1000000)))''',
+
+    "File Example": '''# Write 100,000 lines in one buffered pass
+writeall("numbers.txt", apply(text, series(1, 100001)))
+
+# Stream the lines back without loading the whole file
+display("Sum:", total(apply(whole, eachline("numbers.txt"))))
+
+# Read in 64 KB chunks and count the line endings
+newlines = 0
+repeat chunk inside eachchunk("numbers.txt", 65536):
+    newlines = newlines + chunk.count(b"\\n")
+display("Lines:", newlines)
+
+# Memory-map the file and search it without reading it first
+data = mapfile("numbers.txt")
+display("99999 starts at byte", data.find(b"99999"))''',
+
+    "Async Example": '''import asyncio
+import time
+
+# A local echo server stands in for a slow service: each reply takes 0.5 s
+concurrent create echo(reader, writer):
+    line = waitfor reader.readline()
+    waitfor asyncio.sleep(0.5)
+    writer.write(line)
+    waitfor writer.drain()
+    writer.close()
+
+concurrent create call(port, message):
+    reader, writer = waitfor asyncio.open_connection("127.0.0.1", port)
+    writer.write((message + "\\n").encode())
+    reply = waitfor reader.readline()
+    writer.close()
+    giveback reply.decode().strip()
+
+server = waitfor asyncio.start_server(echo, "127.0.0.1", 0)
+port = server.sockets[0].getsockname()[1]
+
+# 100 calls of 0.5 s each finish in about 0.5 s, not 50 s
+started = time.perf_counter()
+replies = waitfor together(call(port, "hello " + text(n)) for n in series(100))
+display("Got", len(replies), "replies in", round(time.perf_counter() - started, 2), "seconds")
+display("First and last:", replies[0], "/", replies[-1])
+
+server.close()
+waitfor server.wait_closed()'''
 }
 
 
@@ -719,6 +1590,10 @@ def display_tokenization_res_explanation():
 
     """)
     
+# Folder the IDE gives programs' file builtins unless told otherwise: a
+# folder of its own, so programs cannot overwrite the IDE's files
+default_file_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'simpy_files')
+
 # Main function to run the Streamlit app
 def main():
     st.title("Simpy Compiler and IDE")
@@ -741,23 +1616,34 @@ def main():
         # Code input area
         code_input = st.text_area("Write your Simpy code here:", value=code_input, height=300)
 
+        optimize = st.checkbox("Optimize (fold constants and remove dead branches)")
+        file_root = st.text_input("Folder your program's files live in (file builtins cannot leave it):",
+                                  value=os.environ.get("SIMPY_FILE_ROOT", default_file_root))
+
         # Run code button
         if st.button("Run Code"):
-            # Translate the Simpy code to Python code
-            python_code = translate_simpy_to_python(code_input)
-
             # Capture the output of the executed code
             old_stdout = sys.stdout
             redirected_output = sys.stdout = io.StringIO()
 
             try:
-                # Execute the Python code
-                exec(python_code, {})
+                # Translate the Simpy code to Python code and compile it
+                code, report = compile_simpy_code(code_input, optimize)
+                # Let the program import .simpy modules
+                install_simpy_importer()
+                # Execute the Python code, keeping its file builtins inside the chosen folder
+                if file_root:
+                    os.makedirs(file_root, exist_ok=True)
+                execute_simpy_code(code, {}, file_root)
                 # Get the output
                 output = redirected_output.getvalue()
                 # Display the output
                 st.subheader("Output")
                 st.code(output)
+                if optimize:
+                    st.subheader("Optimization Report")
+                    for line in report or ["Nothing to optimize."]:
+                        st.write("- " + line)
             except Exception as e:
                 # Display the error message
                 st.subheader("Error")
@@ -776,6 +1662,12 @@ def main():
                 ### Function Definition and Return
                 create: def |
                 giveback: return |
+                produce: yield |
+
+                ### Concurrency
+                concurrent: async |
+                waitfor: await |
+                together: gather |
 
                 ### Data Types
                 whole: int |
@@ -792,12 +1684,41 @@ def main():
                 lessequal: <= |
                 notequals: != |
 
+                ### Membership Operators
+                inside: in |
+
                 ### Logical Values
                 yes: True |
                 no: False |
 
                 ### Built-in Functions
-                display: print
+                display: print |
+
+                ### Lazy Built-in Functions
+                series: range |
+                apply: map |
+                select: filter |
+
+                ### Vectors
+                vector: numpy array |
+                total: sum |
+                maximum: max |
+                minimum: min |
+                average: mean |
+
+                ### File Input and Output
+                access: open |
+                eachline: stream lines |
+                eachchunk: stream chunks |
+                mapfile: memory map |
+                writeall: bulk write |
+
+                ### Parallel Loops
+                repeat parallel x inside items workers 4 into results: |
+
+                ### Remembered Functions
+                remember create fib(n): |
+                remember(500) create fib(n):
                 """)
 
     elif page == "Language Documentation":
@@ -813,6 +1734,119 @@ def main():
             simpy_keyword = simpy_regex.strip(r'\b').replace(r'\s+', ' ')
             st.markdown(f"- **Simpy Keyword**: `{simpy_keyword}` ➔ **Python Equivalent**: `{python_keyword}`")
             st.markdown(f"  - **Regex**: `{simpy_regex}`")
+
+        st.subheader("Runtime Builtins")
+
+        st.write("These keep their names and come from `simpy_runtime`, which is imported into each program that uses them. "
+                 "A program may still use one of these names for its own variable or function.")
+        st.markdown(" ".join(f"`{name}`" for name in runtime_builtins))
+
+        st.subheader("Generators and Lazy Pipelines")
+
+        st.write("""
+        A function that uses `produce` instead of `giveback` is a generator: each `produce` hands one value
+        to whoever is looping over it and pauses until the next value is asked for.
+
+        `series`, `apply` and `select` are lazy as well. `series(1000000)` counts without building a list,
+        `apply(f, values)` calls `f` on each value only when it is needed, and `select(f, values)` keeps the
+        values for which `f` gives `yes`. Pipelines built from them, such as
+        `select(is_valid, apply(parse, lines))`, stream one element at a time through every stage and use the
+        same small amount of memory however large the input is. `repeat`, `total`, `maximum`, `minimum`
+        and `vector` all consume a pipeline element by element too.
+
+        Wrap a pipeline in `array(...)` only when you really need every value in memory at once.
+        """)
+
+        st.subheader("Concurrency")
+
+        st.write("""
+        `concurrent create` defines a function that can wait for slow input and output (network calls,
+        servers, timers) without blocking the rest of the program. Inside it, and at the top level of a
+        program, `waitfor` waits for one such call, and `together(...)` starts many calls at once and waits
+        until all of them are done, giving their results in order.
+
+        ```plaintext
+        concurrent create fetch(host):
+            reader, writer = waitfor asyncio.open_connection(host, 80)
+            ...
+
+        pages = waitfor together(fetch(host) for host in hosts)
+        ```
+
+        A program that waits on 100 services one after another takes as long as all the calls added up;
+        with `together` it takes about as long as the slowest call. Run Code and `python main.py run` start
+        the event loop for you; modules imported with `import` can only use `waitfor` inside functions.
+        """)
+
+        st.subheader("File Input and Output")
+
+        st.write("""
+        | Builtin | What it does |
+        |---|---|
+        | `access(path, mode)` | Opens a file like Python's `open`, with a 1 MB buffer and UTF-8 text by default |
+        | `eachline(path)` | Streams the lines of a text file one at a time, without their line endings |
+        | `eachchunk(path, size)` | Streams a file as bytes, `size` bytes at a time (default 1 MB) |
+        | `mapfile(path)` | Maps a file into memory read-only; slice it or `find` in it without reading it all |
+        | `writeall(path, data)` | Writes text, bytes, or a collection of lines (one per line) in one buffered pass |
+
+        `eachline` and `eachchunk` are lazy, so `select(is_error, eachline("app.log"))` goes through a
+        multi-GB log in constant memory. In the IDE these builtins can only use files inside the folder
+        chosen above the Run Code button (by default the `simpy_files` folder next to the IDE, or
+        `SIMPY_FILE_ROOT`); from the command line use
+        `python main.py run program.simpy --file-root FOLDER`. The limit applies to the Simpy file
+        builtins, not to Python modules a program imports.
+        """)
+
+        st.subheader("Vectors and Vectorized Operations")
+
+        st.write("""
+        `vector` creates a NumPy array, e.g. `vector([1, 2, 3])`, `vector(series(1000000))` or `vector(values, decimal)`.
+        Operations on whole vectors run inside NumPy instead of looping element by element with `repeat`,
+        which is typically 10-100x faster on large vectors.
+
+        | Operation | Example | Vectorized |
+        |---|---|---|
+        | Arithmetic: `+`, `-`, `*`, `/`, `//`, `%`, `**` | `prices * 1.2` | Yes, elementwise |
+        | Comparisons: `equals`, `notequals`, `greater`, `less`, `greaterequal`, `lessequal` | `ages greaterequal 18` | Yes, gives a boolean mask |
+        | Combining masks: `&`, `\\|`, `~` | `(x greater 0) & (x less 10)` | Yes, elementwise |
+        | Selecting with a mask | `ages[ages greaterequal 18]` | Yes |
+        | `total`, `maximum`, `minimum`, `average` | `average(prices)` | Yes, reduced by NumPy |
+        | `repeat x in values:` | | No, runs once per element |
+        | `check` on a vector | | No, use a mask or `total(mask)` instead |
+
+        `total`, `maximum`, `minimum` and `average` also work on arrays and other collections, like Python's `sum`, `max` and `min`.
+        """)
+
+        st.subheader("Parallel Loops")
+
+        st.write("""
+        `repeat parallel x inside items:` runs the loop body for each item on a pool of worker processes,
+        so CPU-heavy loops use every core instead of one.
+
+        - `workers N` sets the number of worker processes (default: one per CPU core).
+        - `giveback value` sends a value back from the body; `into name` collects those values, in item order, into a list.
+        - Output from `display` in the body is shown in item order.
+        - The body cannot change variables from outside the loop (each worker has its own copy), and `break` is not allowed.
+        - Items, and variables the body uses, must be plain data that can be sent to another process.
+
+        ```plaintext
+        repeat parallel n inside sizes workers 4 into scores:
+            giveback score(n)
+        ```
+        """)
+
+        st.subheader("Remembered Functions")
+
+        st.write("""
+        `remember create` defines a function that remembers its results: calling it again with the same
+        arguments returns the saved result instead of recomputing it. Recursive functions such as `fib`
+        go from exponential to linear time.
+
+        - `remember create fib(n):` keeps the 128 most recently used results; `remember(500) create fib(n):` keeps 500.
+        - A return annotation (`remember create fib(n) -> whole:`) and a body on the same line (`remember create double(n): giveback n * 2`) work as with `create`.
+        - `fib.stats()` shows hits, misses and how many results are saved; `fib.forget()` clears them.
+        - Arguments must be hashable (numbers, text, tuples), not arrays or maps.
+        """)
     
     elif page == "Tokenization Process":
         st.header("Simpy Tokenization Process")
@@ -871,6 +1905,8 @@ def main():
         # Code input area
         code_input = st.text_area("Enter Simpy code to translate:", value=code_input, height=300)
         
+        optimize = st.checkbox("Optimize (fold constants and remove dead branches)")
+
         if st.button("Translate Code"):
             try:
                 python_code, explanations = translate_simpy_to_python_with_explanation(code_input)
@@ -881,9 +1917,23 @@ def main():
                 st.subheader("Step-by-Step Explanation")
                 for explanation in explanations:
                     st.write("- " + explanation)
+
+                if optimize:
+                    tree, report = optimize_python_code(python_code)
+
+                    st.subheader("Optimized Python Code")
+                    st.code(ast.unparse(tree), language='python')
+
+                    st.subheader("Optimization Report")
+                    for line in report or ["Nothing to optimize."]:
+                        st.write("- " + line)
             except Exception as e:
                 st.subheader("Error")
                 st.error(e)
+
+        if st.button("Benchmark Optimizer on Sample Programs"):
+            st.subheader("Optimizer Benchmark")
+            st.table(pd.DataFrame(benchmark_sample_programs()))
                 
     elif page == "Language Customization Guide":
         st.header("Language Customization Guide")
@@ -893,5 +1943,37 @@ def main():
         st.header("Tokenization Regular Expressions Explanation")
         display_tokenization_res_explanation()
 
+# Command line interface: `python main.py run|package ...`
+# Without arguments, e.g. under `streamlit run main.py`, the app starts instead.
+def cli(argv):
+    parser = argparse.ArgumentParser(prog="python main.py", description="Simpy command line tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Translate and run a Simpy file")
+    run_parser.add_argument("file", help="Simpy file to run")
+    run_parser.add_argument("--optimize", action="store_true", help="Fold constants and remove dead branches")
+    run_parser.add_argument("--file-root", help="Only let the program's file builtins use files under this folder")
+
+    package_parser = subparsers.add_parser("package", help="Package a Simpy program into a precompiled .pyz zipapp")
+    package_parser.add_argument("entry", help="Simpy file that starts the program")
+    package_parser.add_argument("modules", nargs="*", help="Simpy modules imported by the program")
+    package_parser.add_argument("-o", "--output", help="Archive to write (default: <entry>.pyz)")
+    package_parser.add_argument("--optimize", action="store_true", help="Fold constants and remove dead branches")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run_simpy_file(args.file, args.optimize, args.file_root)
+    elif args.command == "package":
+        output = args.output or os.path.splitext(args.entry)[0] + ".pyz"
+        package_simpy_program(args.entry, output, args.modules, args.optimize)
+        print(f"Packaged {args.entry} into {output}")
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        cli(sys.argv[1:])
+    else:
+        # The UI libraries are only imported for the app, so the command line,
+        # the language server and the tests use the translator without them
+        import streamlit as st
+        import pandas as pd
+        main()
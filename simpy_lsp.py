@@ -0,0 +1,391 @@
+# simpy_lsp.py
+#
+# Language Server Protocol server for Simpy, spoken over stdio.
+# Point your editor's LSP client at:  python simpy_lsp.py
+#
+# Supports incremental document sync, semantic-token highlighting for Simpy
+# keywords, hover with the Python equivalent of a keyword and debounced
+# diagnostics from compiling the translated Python code. Tokens and
+# translations are cached per line of text, so a keystroke only pays for
+# the lines it actually changed.
+
+import itertools
+import json
+import re
+import sys
+import threading
+from functools import lru_cache
+
+from main import compile_python_code, keyword_mapping, runtime_builtins, tokenize_simpy_line, translate_simpy_to_python
+
+# Semantic token legend sent to the client; the index is the token type id
+semantic_token_types = ['keyword', 'string', 'number', 'operator']
+semantic_token_ids = {
+    'KEYWORD': 0,
+    'STRING': 1,
+    'NUMBER': 2,
+    'OPERATOR': 3,
+}
+
+# Seconds to wait after the last edit before compiling for diagnostics
+diagnostics_delay = 0.3
+
+# Python equivalent of every Simpy keyword, for hover
+python_equivalents = {
+    re.sub(r'^\\b|\\b$', '', simpy_regex): python_keyword
+    for simpy_regex, python_keyword in keyword_mapping.items()
+}
+python_equivalents.update((name, f'simpy_runtime.{name}') for name in runtime_builtins)
+
+
+# Position encodings the server can speak, in order of preference. LSP
+# columns count UTF-16 code units unless the client agrees to another
+# encoding; 'utf-32' counts code points, the same as Python string indices.
+position_encodings = ['utf-32', 'utf-16']
+
+
+# Function to turn an LSP column into an index into the line's text
+def column_to_index(line, column, encoding):
+    if encoding == 'utf-32' or line.isascii():
+        return min(column, len(line))
+    units = 0
+    for index, char in enumerate(line):
+        if units >= column:
+            return index
+        # Characters outside the Basic Multilingual Plane take two UTF-16 code units
+        units += 2 if ord(char) > 0xFFFF else 1
+    return len(line)
+
+
+# Function to turn an index into the line's text into an LSP column
+def index_to_column(line, index, encoding):
+    if encoding == 'utf-32' or line.isascii():
+        return index
+    return index + sum(1 for char in line[:index] if ord(char) > 0xFFFF)
+
+
+# Function to encode a line's semantic tokens (cached per line text)
+# Gives the line's part of the LSP token data, except the first token's
+# line delta, which depends on the lines before it.
+@lru_cache(maxsize=16384)
+def semantic_line_data(line, encoding):
+    data = []
+    previous_column = 0
+    for token_type, value, column in tokenize_simpy_line(line.rstrip('\r')):
+        if token_type in semantic_token_ids:
+            start = index_to_column(line, column, encoding)
+            end = index_to_column(line, column + len(value), encoding)
+            data.extend((0, start - previous_column, end - start, semantic_token_ids[token_type], 0))
+            previous_column = start
+    return tuple(data[1:])
+
+
+# Function to turn two versions of a document's token chunks (see
+# SimpyDocument.semantic_token_chunks) into a single SemanticTokensEdit
+# Only the chunks between the unchanged start and end are sent again.
+def semantic_tokens_edits(previous, current):
+    start = 0
+    limit = min(len(previous), len(current))
+    while start < limit and previous[start] == current[start]:
+        start += 1
+    end = 0
+    while end < limit - start and previous[-1 - end] == current[-1 - end]:
+        end += 1
+    if start == len(previous) == len(current):
+        return []
+    return [{
+        'start': sum(map(len, previous[:start])),
+        'deleteCount': sum(map(len, previous[start:len(previous) - end])),
+        'data': list(itertools.chain.from_iterable(current[start:len(current) - end])),
+    }]
+
+
+# Function to find the keyword under the cursor (cached per line text)
+@lru_cache(maxsize=8192)
+def line_keywords(line):
+    return tuple(
+        (column, value)
+        for token_type, value, column in tokenize_simpy_line(line.rstrip('\r'))
+        if token_type == 'KEYWORD'
+    )
+
+
+# Function to translate one line of Simpy code (cached per line text)
+# Keyword patterns never span a newline, so translating line by line gives
+# the same result as translating the whole document at once, except inside
+# triple-quoted strings that span lines, whose text does not affect whether
+# the program compiles.
+@lru_cache(maxsize=8192)
+def translate_line(line):
+    return translate_simpy_to_python(line.rstrip('\r'))
+
+
+class SimpyDocument:
+    def __init__(self, text, version, encoding='utf-16'):
+        self.lines = text.split('\n')
+        self.version = version
+        self.encoding = encoding
+
+    # Apply one TextDocumentContentChangeEvent (incremental or full)
+    def apply_change(self, change):
+        if 'range' not in change:
+            self.lines = change['text'].split('\n')
+            return
+        start = change['range']['start']
+        end = change['range']['end']
+        # Edits may point one past the last line (e.g. appending at the end)
+        while len(self.lines) <= end['line']:
+            self.lines.append('')
+        start_line = self.lines[start['line']]
+        end_line = self.lines[end['line']]
+        head = start_line[:column_to_index(start_line, start['character'], self.encoding)]
+        tail = end_line[column_to_index(end_line, end['character'], self.encoding):]
+        self.lines[start['line']:end['line'] + 1] = (head + change['text'] + tail).split('\n')
+
+    # The token data of each line that has tokens, as a list of tuples; an
+    # edit only changes the chunks of the lines it touches and the line after
+    def semantic_token_chunks(self):
+        chunks = []
+        previous_line = 0
+        for line_num, line in enumerate(self.lines):
+            data = semantic_line_data(line, self.encoding)
+            if data:
+                chunks.append((line_num - previous_line,) + data)
+                previous_line = line_num
+        return chunks
+
+    def semantic_tokens(self):
+        return list(itertools.chain.from_iterable(self.semantic_token_chunks()))
+
+    def hover(self, line_num, character):
+        if line_num >= len(self.lines):
+            return None
+        line = self.lines[line_num]
+        character = column_to_index(line, character, self.encoding)
+        for column, value in line_keywords(line):
+            if column <= character < column + len(value):
+                python_keyword = python_equivalents.get(value)
+                if python_keyword is None:
+                    return None
+                return {
+                    'contents': {
+                        'kind': 'markdown',
+                        'value': f"**Simpy Keyword**: `{value}` ➔ **Python Equivalent**: `{python_keyword}`",
+                    },
+                    'range': {
+                        'start': {'line': line_num, 'character': index_to_column(line, column, self.encoding)},
+                        'end': {'line': line_num, 'character': index_to_column(line, column + len(value), self.encoding)},
+                    },
+                }
+        return None
+
+    def diagnostics(self):
+        python_code = '\n'.join(translate_line(line) for line in self.lines)
+        try:
+            compile_python_code(python_code)
+        except (SyntaxError, ValueError) as e:
+            # e.g. a ValueError for a null byte in the document, which has no line number
+            lineno = getattr(e, 'lineno', None)
+            message = e.msg if isinstance(e, SyntaxError) else str(e)
+            # Translation keeps line numbers but not columns, so mark the whole line
+            line_num = min(max((lineno or 1) - 1, 0), len(self.lines) - 1)
+            line = self.lines[line_num].rstrip('\r')
+            return [{
+                'range': {
+                    'start': {'line': line_num, 'character': index_to_column(line, len(line) - len(line.lstrip()), self.encoding)},
+                    'end': {'line': line_num, 'character': index_to_column(line, len(line), self.encoding)},
+                },
+                'severity': 1,
+                'source': 'simpy',
+                'message': message,
+            }]
+        return []
+
+
+class SimpyLanguageServer:
+    def __init__(self, reader=None, writer=None):
+        self.reader = reader or sys.stdin.buffer
+        self.writer = writer or sys.stdout.buffer
+        self.documents = {}
+        self.timers = {}
+        # Last semantic tokens sent per document: (result id, chunks), for deltas
+        self.semantic_results = {}
+        self.result_ids = itertools.count(1)
+        self.position_encoding = 'utf-16'
+        self.lock = threading.Lock()
+        self.running = True
+
+    # JSON-RPC framing: "Content-Length: N\r\n\r\n" followed by N bytes of JSON
+    def read_message(self):
+        content_length = None
+        while True:
+            header = self.reader.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.decode('ascii').partition(':')
+            if name.lower() == 'content-length':
+                content_length = int(value.strip())
+        if content_length is None:
+            return None
+        return json.loads(self.reader.read(content_length))
+
+    def send(self, message):
+        message['jsonrpc'] = '2.0'
+        body = json.dumps(message).encode('utf-8')
+        with self.lock:
+            self.writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+            self.writer.flush()
+
+    def serve(self):
+        while self.running:
+            message = self.read_message()
+            if message is None:
+                break
+            self.dispatch(message)
+        for timer in list(self.timers.values()):
+            timer.cancel()
+
+    def dispatch(self, message):
+        method = message.get('method')
+        params = message.get('params') or {}
+        handler = self.handlers().get(method)
+        if 'id' not in message:
+            if handler:
+                handler(params)
+            return
+        if handler is None:
+            self.send({'id': message['id'], 'error': {'code': -32601, 'message': f"Method not found: {method}"}})
+            return
+        try:
+            self.send({'id': message['id'], 'result': handler(params)})
+        except Exception as e:
+            self.send({'id': message['id'], 'error': {'code': -32603, 'message': str(e)}})
+
+    def handlers(self):
+        return {
+            'initialize': self.initialize,
+            'initialized': lambda params: None,
+            'shutdown': lambda params: None,
+            'exit': self.exit,
+            'textDocument/didOpen': self.did_open,
+            'textDocument/didChange': self.did_change,
+            'textDocument/didClose': self.did_close,
+            'textDocument/semanticTokens/full': self.semantic_tokens,
+            'textDocument/semanticTokens/full/delta': self.semantic_tokens_delta,
+            'textDocument/hover': self.hover,
+        }
+
+    # Use the first encoding the client offers that the server speaks; clients
+    # that offer none only speak UTF-16
+    def initialize(self, params):
+        offered = ((params.get('capabilities') or {}).get('general') or {}).get('positionEncodings') or ['utf-16']
+        self.position_encoding = next((encoding for encoding in offered if encoding in position_encodings), 'utf-16')
+        return {
+            'capabilities': {
+                'positionEncoding': self.position_encoding,
+                'textDocumentSync': {'openClose': True, 'change': 2},
+                'semanticTokensProvider': {
+                    'legend': {'tokenTypes': semantic_token_types, 'tokenModifiers': []},
+                    'full': {'delta': True},
+                },
+                'hoverProvider': True,
+            },
+            'serverInfo': {'name': 'simpy-lsp'},
+        }
+
+    def exit(self, params):
+        self.running = False
+
+    def did_open(self, params):
+        document = params['textDocument']
+        with self.lock:
+            self.documents[document['uri']] = SimpyDocument(document['text'], document.get('version'), self.position_encoding)
+        self.schedule_diagnostics(document['uri'])
+
+    def did_change(self, params):
+        uri = params['textDocument']['uri']
+        with self.lock:
+            document = self.documents.get(uri)
+            if document is None:
+                return
+            for change in params['contentChanges']:
+                document.apply_change(change)
+            document.version = params['textDocument'].get('version')
+        self.schedule_diagnostics(uri)
+
+    def did_close(self, params):
+        uri = params['textDocument']['uri']
+        with self.lock:
+            self.documents.pop(uri, None)
+            self.semantic_results.pop(uri, None)
+            timer = self.timers.pop(uri, None)
+        if timer:
+            timer.cancel()
+        self.send({'method': 'textDocument/publishDiagnostics', 'params': {'uri': uri, 'diagnostics': []}})
+
+    def semantic_tokens(self, params):
+        uri = params['textDocument']['uri']
+        with self.lock:
+            document = self.documents.get(uri)
+            if document is None:
+                return {'data': []}
+            chunks = document.semantic_token_chunks()
+            result_id = str(next(self.result_ids))
+            self.semantic_results[uri] = (result_id, chunks)
+        return {'resultId': result_id, 'data': list(itertools.chain.from_iterable(chunks))}
+
+    # Send only what changed since the tokens the client already has; if the
+    # server no longer has those (e.g. after a restart), send them all
+    def semantic_tokens_delta(self, params):
+        uri = params['textDocument']['uri']
+        with self.lock:
+            document = self.documents.get(uri)
+            if document is None:
+                return {'data': []}
+            previous_id, previous_chunks = self.semantic_results.get(uri, (None, None))
+            chunks = document.semantic_token_chunks()
+            result_id = str(next(self.result_ids))
+            self.semantic_results[uri] = (result_id, chunks)
+        if previous_id is None or previous_id != params.get('previousResultId'):
+            return {'resultId': result_id, 'data': list(itertools.chain.from_iterable(chunks))}
+        return {'resultId': result_id, 'edits': semantic_tokens_edits(previous_chunks, chunks)}
+
+    def hover(self, params):
+        position = params['position']
+        with self.lock:
+            document = self.documents.get(params['textDocument']['uri'])
+            if document is None:
+                return None
+            return document.hover(position['line'], position['character'])
+
+    # Restart the diagnostics timer so only the last of a burst of edits compiles
+    def schedule_diagnostics(self, uri):
+        timer = threading.Timer(diagnostics_delay, self.publish_diagnostics, args=(uri,))
+        timer.daemon = True
+        with self.lock:
+            previous = self.timers.get(uri)
+            if previous:
+                previous.cancel()
+            self.timers[uri] = timer
+        timer.start()
+
+    def publish_diagnostics(self, uri):
+        with self.lock:
+            document = self.documents.get(uri)
+            if document is None or self.timers.get(uri) is not threading.current_thread():
+                return
+            del self.timers[uri]
+            lines = list(document.lines)
+            version = document.version
+        diagnostics = SimpyDocument('\n'.join(lines), version, self.position_encoding).diagnostics()
+        self.send({
+            'method': 'textDocument/publishDiagnostics',
+            'params': {'uri': uri, 'version': version, 'diagnostics': diagnostics},
+        })
+
+
+if __name__ == "__main__":
+    SimpyLanguageServer().serve()
@@ -0,0 +1,350 @@
+# simpy_runtime.py
+#
+# Runtime support for translated Simpy programs. Builtins that have no
+# single Python equivalent (vector, total, eachline, together, ...) are
+# defined here, and the compiler imports the ones a program uses into the
+# program's own globals.
+#
+# This module must not import Streamlit or pandas: packaged programs bundle
+# it as their whole runtime, and every packaged program that uses a single
+# builtin imports it at startup. So only cheap modules are imported here;
+# NumPy, the process pool, pickle and friends are imported by the functions
+# that need them.
+
+import builtins
+import contextvars
+import functools
+import io
+import marshal
+import math
+import os
+import sys
+import types
+
+
+# Folder that Simpy file builtins are confined to; None allows any path.
+# Set per execution (see set_file_root), so programs run at the same time,
+# e.g. by two IDE sessions, each keep their own folder.
+file_root = contextvars.ContextVar('simpy_file_root', default=None)
+
+# Buffer size for file builtins: big enough that reading or writing a large
+# file takes few system calls, small enough to stay in cache
+buffer_size = 1024 * 1024
+
+
+# Function to check for a NumPy array without importing NumPy
+def is_vector(value):
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+# vector: NumPy array, e.g. vector([1, 2, 3]) or vector(series(10), decimal)
+def vector(values=(), kind=None):
+    import numpy
+    if isinstance(values, range):
+        return numpy.arange(values.start, values.stop, values.step, dtype=kind)
+    if is_vector(values) or hasattr(values, '__len__'):
+        return numpy.array(values, dtype=kind)
+    # Iterators and generators are consumed without building a list first
+    return numpy.fromiter(values, dtype=kind or float)
+
+
+# total: sum; vectors are summed by NumPy instead of element by element
+def total(values, start=0):
+    if is_vector(values):
+        return values.sum().item() + start
+    return builtins.sum(values, start)
+
+
+# maximum: max; a single vector argument is reduced by NumPy
+def maximum(*args, **kwargs):
+    if len(args) == 1 and not kwargs and is_vector(args[0]):
+        return args[0].max().item()
+    return builtins.max(*args, **kwargs)
+
+
+# minimum: min; a single vector argument is reduced by NumPy
+def minimum(*args, **kwargs):
+    if len(args) == 1 and not kwargs and is_vector(args[0]):
+        return args[0].min().item()
+    return builtins.min(*args, **kwargs)
+
+
+# average: arithmetic mean of a vector or any collection of numbers
+def average(values):
+    if is_vector(values):
+        return values.mean().item()
+    values = list(values)
+    if not values:
+        raise ValueError("average() of an empty collection")
+    return builtins.sum(values) / len(values)
+
+
+# remember: decorator for `remember create`, a bounded LRU cache of results
+# fib.stats() gives hits and misses (like cache_info()) and fib.forget()
+# empties the cache (like cache_clear()). The lru_cache wrapper is returned
+# as is, so a recursive function costs no extra frame per call; the error
+# for unhashable arguments is made readable by explain_unhashable_argument().
+def remember(maxsize=128):
+    def decorate(function):
+        cached = functools.lru_cache(maxsize=maxsize)(function)
+        cached.maxsize = maxsize
+        cached.stats = cached.cache_info
+        cached.forget = cached.cache_clear
+        return cached
+    return decorate
+
+
+# Function to explain lru_cache's "unhashable type: 'list'" when the call
+# that failed was to a `remember` function. Returns a clearer TypeError, or
+# None when the error has nothing to do with `remember` or the function
+# called cannot be told for sure.
+def explain_unhashable_argument(error):
+    if not isinstance(error, TypeError) or not str(error).startswith('unhashable type'):
+        return None
+    import dis
+    traceback = error.__traceback__
+    if traceback is None:
+        return None
+    while traceback.tb_next is not None:
+        traceback = traceback.tb_next
+    frame = traceback.tb_frame
+    instructions = list(dis.get_instructions(frame.f_code))
+    call = next((instruction for instruction in instructions if instruction.offset == traceback.tb_lasti), None)
+    if call is None or not call.opname.startswith('CALL') or call.positions.lineno is None:
+        return None
+
+    # The function called is the expression the call starts with: of the
+    # instructions before the call that start where it starts, the one that
+    # reaches furthest without covering the argument list. In `fib(x)(y)`
+    # that is the call fib(x), which cannot be told without running it again.
+    start = (call.positions.lineno, call.positions.col_offset)
+    end = (call.positions.end_lineno, call.positions.end_col_offset)
+    callee = None
+    for instruction in instructions:
+        if instruction.offset >= call.offset:
+            break
+        position = instruction.positions
+        if position.lineno is None or (position.lineno, position.col_offset) != start:
+            continue
+        if (position.end_lineno, position.end_col_offset) >= end:
+            continue
+        if callee is None or (position.end_lineno, position.end_col_offset) >= (callee.positions.end_lineno, callee.positions.end_col_offset):
+            callee = instruction
+    if callee is None:
+        return None
+    name = callee.argval
+    if callee.opname in ('LOAD_FAST', 'LOAD_DEREF'):
+        function = frame.f_locals.get(name)
+    elif callee.opname == 'LOAD_NAME':
+        function = frame.f_locals.get(name, frame.f_globals.get(name))
+    elif callee.opname == 'LOAD_GLOBAL':
+        function = frame.f_globals.get(name)
+    else:
+        return None
+    if not (hasattr(function, 'forget') and hasattr(function, 'cache_info') and hasattr(function, '__wrapped__')):
+        return None
+    kind = str(error).partition(':')[2].strip().strip("'")
+    return TypeError(
+        f"{function.__name__}() is a `remember` function, so its arguments must be hashable, "
+        f"but one of them is a {kind}. Pass numbers, text or tuples instead of arrays or maps."
+    )
+
+
+# parallel: marks the items of a `repeat parallel` loop. The compiler turns
+# the loop into a run_parallel() call, so on its own this only iterates.
+def parallel(items, workers=None, into=None):
+    return items
+
+
+# Function to describe a function so a worker process can rebuild it
+# Program functions cannot be pickled by reference (they live in an exec'd
+# namespace), so the body's bytecode is sent along with the globals it uses,
+# following calls into other program functions.
+def export_function(function):
+    import pickle
+    program_globals = function.__globals__
+    functions = {}
+    modules = {}
+    values = {}
+    pending = [function.__code__]
+    seen = set()
+    while pending:
+        code = pending.pop()
+        pending.extend(const for const in code.co_consts if isinstance(const, types.CodeType))
+        for name in code.co_names:
+            if name in seen or name not in program_globals:
+                continue
+            seen.add(name)
+            value = program_globals[name]
+            if isinstance(value, types.ModuleType):
+                modules[name] = value.__name__
+            elif isinstance(value, types.FunctionType) and value.__globals__ is program_globals and not value.__closure__:
+                functions[name] = (marshal.dumps(value.__code__), value.__defaults__, False)
+                pending.append(value.__code__)
+            elif hasattr(value, 'forget') and getattr(value, '__wrapped__', None) is not None \
+                    and getattr(value.__wrapped__, '__globals__', None) is program_globals:
+                # A `remember` function: rebuilt in the worker with an empty cache of its own
+                function_code = value.__wrapped__.__code__
+                functions[name] = (marshal.dumps(function_code), value.__wrapped__.__defaults__, value.maxsize)
+                pending.append(function_code)
+            else:
+                values[name] = value
+    closure = [cell.cell_contents for cell in function.__closure__ or ()]
+    exported = (marshal.dumps(function.__code__), closure, functions, modules, values)
+    try:
+        return pickle.dumps(exported)
+    except Exception:
+        for name, value in list(values.items()) + [('(enclosing variable)', value) for value in closure]:
+            try:
+                pickle.dumps(value)
+            except Exception as e:
+                raise TypeError(f"repeat parallel: the loop body uses `{name}`, which cannot be sent to a worker process: {e}") from None
+        raise
+
+
+# Function run inside a worker process for one chunk of items
+# Returns the results in item order and everything the body displayed.
+def run_parallel_chunk(exported, chunk, root=None):
+    import importlib
+    import pickle
+    file_root.set(root)
+    code, closure, functions, modules, values = pickle.loads(exported)
+    program_globals = {'__builtins__': builtins, '__name__': '__simpy_worker__'}
+    program_globals.update(values)
+    for name, module_name in modules.items():
+        program_globals[name] = importlib.import_module(module_name)
+    for name, (function_code, defaults, maxsize) in functions.items():
+        program_globals[name] = types.FunctionType(marshal.loads(function_code), program_globals, name, defaults)
+        if maxsize is not False:
+            program_globals[name] = remember(maxsize)(program_globals[name])
+    cells = tuple(types.CellType(value) for value in closure) or None
+    body = types.FunctionType(marshal.loads(code), program_globals, None, None, cells)
+
+    old_stdout = sys.stdout
+    output = sys.stdout = io.StringIO()
+    try:
+        results = [body(item) for item in pickle.loads(chunk)]
+    finally:
+        sys.stdout = old_stdout
+    return results, output.getvalue()
+
+
+# Function that runs a `repeat parallel` loop body once per item
+# Items are split into chunks (about four per worker, to even out uneven
+# items) and run on a process pool. Results and displayed output come back
+# in item order, whatever order the chunks finish in.
+def run_parallel(body, items, workers=None):
+    import concurrent.futures
+    import pickle
+    import reprlib
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+
+    # Items are checked even when running on one worker, so a program that
+    # works on a single core also works on many
+    chunk_size = max(1, math.ceil(len(items) / (workers * 4)))
+    chunks = []
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        try:
+            chunks.append(pickle.dumps(chunk))
+        except Exception:
+            for index, item in enumerate(chunk, start):
+                try:
+                    pickle.dumps(item)
+                except Exception as e:
+                    raise TypeError(f"repeat parallel: item {index} ({reprlib.repr(item)}) cannot be sent to a worker process: {e}") from None
+            raise
+    if workers == 1 or len(chunks) < 2:
+        return [body(item) for item in items]
+    exported = export_function(body)
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        # Workers do not share the caller's context, so the file root is passed along
+        futures = [pool.submit(run_parallel_chunk, exported, chunk, file_root.get()) for chunk in chunks]
+        for future in futures:
+            chunk_results, output = future.result()
+            sys.stdout.write(output)
+            results.extend(chunk_results)
+    return results
+
+
+# Function to confine file builtins to a folder (None removes the limit)
+# Only affects the current thread or task; returns a token for
+# file_root.reset() that restores the previous folder.
+def set_file_root(path):
+    return file_root.set(os.path.realpath(path) if path else None)
+
+
+# Function to turn a program's path into a real path inside file_root
+def resolve_path(path):
+    root = file_root.get()
+    if root is None:
+        return path
+    full_path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root:
+        raise PermissionError(f"`{path}` is outside the folder Simpy programs may use ({root})")
+    return full_path
+
+
+# access: open, with a large buffer and UTF-8 text by default
+def access(path, mode='r', encoding=None, buffering=None):
+    if encoding is None and 'b' not in mode:
+        encoding = 'utf-8'
+    return builtins.open(resolve_path(path), mode, buffering=buffer_size if buffering is None else buffering, encoding=encoding)
+
+
+# eachline: streams the lines of a text file, without their line endings
+def eachline(path, encoding='utf-8'):
+    with access(path, encoding=encoding) as file:
+        for line in file:
+            yield line.rstrip('\n')
+
+
+# eachchunk: streams a file as bytes in chunks of `size` bytes
+# Reads go straight to the OS (no second buffer), one chunk per system call.
+def eachchunk(path, size=buffer_size):
+    with access(path, 'rb', buffering=0) as file:
+        while True:
+            chunk = file.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+# mapfile: maps a whole file into memory read-only
+# The OS pages the file in as it is touched, so even files larger than memory
+# can be sliced and searched (find, rfind, slicing) without reading them first.
+def mapfile(path):
+    import mmap
+    with access(path, 'rb', buffering=0) as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# writeall: writes text, bytes or a collection of lines to a file in one go
+# Lines get a newline each and are written through the large buffer.
+def writeall(path, data, encoding='utf-8'):
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        with access(path, 'wb') as file:
+            file.write(data)
+    elif isinstance(data, str):
+        with access(path, 'w', encoding=encoding) as file:
+            file.write(data)
+    else:
+        with access(path, 'w', encoding=encoding) as file:
+            file.writelines(f"{line}\n" for line in data)
+
+
+# together: runs awaitables concurrently and gives their results in order
+# Accepts them as arguments, together(a(), b()), or as one collection,
+# together(fetch(host) for host in hosts).
+def together(*awaitables):
+    import asyncio
+    import inspect
+    if len(awaitables) == 1 and not inspect.isawaitable(awaitables[0]):
+        awaitables = tuple(awaitables[0])
+    return asyncio.gather(*awaitables)
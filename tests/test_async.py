@@ -0,0 +1,88 @@
+# tests/test_async.py
+#
+# Runs a Simpy program that talks to a local asyncio echo server, both
+# through execute_simpy_code and as a packaged .pyz, to check that
+# `together` keeps results in order, calls overlap, and top-level
+# `waitfor` works. Run with:  python -m pytest tests
+
+import asyncio
+import inspect
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import compile_simpy_code, execute_simpy_code, package_simpy_program
+
+# Each call sleeps on the server for a different time; later calls finish first
+echo_program = '''import asyncio
+import os
+
+concurrent create echo(message, delay):
+    reader, writer = waitfor asyncio.open_connection("127.0.0.1", whole(os.environ["SIMPY_ECHO_PORT"]))
+    writer.write(f"{delay} {message}\\n".encode())
+    reply = waitfor reader.readline()
+    writer.close()
+    giveback reply.decode().strip()
+
+replies = waitfor together(echo(text(n), 0.3 - n * 0.05) for n in series(5))
+display(replies)
+'''
+
+expected_output = "['0', '1', '2', '3', '4']\n"
+
+
+# Echo server on a free local port, running its own event loop in a thread
+# Each request is "<seconds> <message>"; the server waits, then echoes the message.
+@pytest.fixture
+def echo_port(monkeypatch):
+    loop = asyncio.new_event_loop()
+
+    async def handle(reader, writer):
+        delay, _, message = (await reader.readline()).decode().strip().partition(' ')
+        await asyncio.sleep(float(delay))
+        writer.write(f"{message}\n".encode())
+        await writer.drain()
+        writer.close()
+
+    server = loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', 0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('SIMPY_ECHO_PORT', str(port))
+    yield port
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+
+
+def test_together_keeps_order_and_overlaps_calls(echo_port, capsys):
+    code, _ = compile_simpy_code(echo_program)
+    assert code.co_flags & inspect.CO_COROUTINE
+
+    start = time.perf_counter()
+    execute_simpy_code(code, {})
+    elapsed = time.perf_counter() - start
+
+    assert capsys.readouterr().out == expected_output
+    # One after another the calls would take 1.0 seconds; together, about the slowest one (0.3)
+    assert elapsed < 0.8
+
+
+def test_packaged_program_runs_top_level_waitfor(echo_port, tmp_path):
+    source_path = tmp_path / 'echo.simpy'
+    source_path.write_text(echo_program, encoding='utf-8')
+    archive_path = tmp_path / 'echo.pyz'
+    package_simpy_program(str(source_path), str(archive_path))
+
+    result = subprocess.run([sys.executable, str(archive_path)], capture_output=True, text=True, timeout=30)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == expected_output
@@ -0,0 +1,99 @@
+# tests/test_importer.py
+#
+# The .simpy import hook caches bytecode in __pycache__/<name>.<tag>.simpyc
+# and only translates a module again when its source, the Simpy dialect or
+# the Python version changes. Run with:  python -m pytest tests
+
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from main import SimpyModuleFinder
+
+
+# Finder for a temporary folder of .simpy modules, removed again afterwards
+@pytest.fixture
+def simpy_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'meta_path', sys.meta_path + [SimpyModuleFinder([str(tmp_path)])])
+    yield tmp_path
+    sys.modules.pop('greeting', None)
+
+
+# Function to count how often modules are translated and compiled
+@pytest.fixture
+def compiles(monkeypatch):
+    calls = []
+    compile_simpy_code = main.compile_simpy_code
+
+    def counting_compile(*args, **kwargs):
+        calls.append(args)
+        return compile_simpy_code(*args, **kwargs)
+
+    monkeypatch.setattr(main, 'compile_simpy_code', counting_compile)
+    return calls
+
+
+# Function to import the module afresh, as a new process would
+def import_greeting():
+    sys.modules.pop('greeting', None)
+    return importlib.import_module('greeting')
+
+
+def cache_path(folder):
+    return folder / '__pycache__' / f"greeting.{sys.implementation.cache_tag}.simpyc"
+
+
+def test_first_import_writes_cache(simpy_folder, compiles):
+    (simpy_folder / 'greeting.simpy').write_text('message = "hello"\n', encoding='utf-8')
+    assert import_greeting().message == "hello"
+    assert len(compiles) == 1
+    assert cache_path(simpy_folder).is_file()
+
+
+def test_unchanged_module_loads_from_cache(simpy_folder, compiles):
+    (simpy_folder / 'greeting.simpy').write_text('message = "hello"\n', encoding='utf-8')
+    import_greeting()
+    assert import_greeting().message == "hello"
+    assert len(compiles) == 1
+
+
+def test_edited_source_is_recompiled(simpy_folder, compiles):
+    source = simpy_folder / 'greeting.simpy'
+    source.write_text('message = "hello"\n', encoding='utf-8')
+    import_greeting()
+    cached = cache_path(simpy_folder).read_bytes()
+
+    source.write_text('message = "goodbye"\n', encoding='utf-8')
+    assert import_greeting().message == "goodbye"
+    assert len(compiles) == 2
+    assert cache_path(simpy_folder).read_bytes() != cached
+
+
+def test_new_dialect_version_recompiles(simpy_folder, compiles, monkeypatch):
+    (simpy_folder / 'greeting.simpy').write_text('message = "hello"\n', encoding='utf-8')
+    import_greeting()
+    monkeypatch.setattr(main, 'simpy_dialect_version', main.simpy_dialect_version + 1)
+    assert import_greeting().message == "hello"
+    assert len(compiles) == 2
+    # The new cache is used from then on
+    import_greeting()
+    assert len(compiles) == 2
+
+
+def test_read_only_folder_compiles_in_memory(simpy_folder, compiles, monkeypatch):
+    (simpy_folder / 'greeting.simpy').write_text('message = "hello"\n', encoding='utf-8')
+
+    def read_only(*args, **kwargs):
+        raise PermissionError(13, "Read-only file system")
+
+    # Running as root ignores file permissions, so refuse the cache directory outright
+    monkeypatch.setattr(main.os, 'makedirs', read_only)
+    assert import_greeting().message == "hello"
+    assert import_greeting().message == "hello"
+    assert len(compiles) == 2
+    assert not cache_path(simpy_folder).exists()
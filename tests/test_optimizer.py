@@ -0,0 +1,117 @@
+# tests/test_optimizer.py
+#
+# The optimizer (compile_simpy_code(..., optimize=True)) must not change what
+# a program does: each program here is run with and without it. Run with:
+#   python -m pytest tests
+
+import inspect
+import os
+import sys
+import traceback
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import compile_simpy_code, execute_simpy_code
+
+
+# Function to run a program and return what it displayed and its report
+def run(simpy_code, optimize, capsys):
+    code, report = compile_simpy_code(simpy_code, optimize)
+    execute_simpy_code(code, {})
+    return capsys.readouterr().out, report
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_dead_produce_keeps_generator(optimize, capsys):
+    output, report = run('''create g():
+    check no:
+        produce 1
+    giveback 5
+
+display(array(g()))
+''', optimize, capsys)
+    assert output == "[]\n"
+    assert report == []
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_dead_waitfor_keeps_coroutine(optimize, capsys):
+    simpy_code = '''import asyncio
+check no:
+    waitfor asyncio.sleep(0)
+display("done")
+'''
+    code, _ = compile_simpy_code(simpy_code, optimize)
+    assert code.co_flags & inspect.CO_COROUTINE
+    assert run(simpy_code, optimize, capsys)[0] == "done\n"
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_dead_assignment_keeps_local(optimize, capsys):
+    output, _ = run('''x = 1
+create f():
+    check no:
+        x = 2
+    display(x)
+
+try:
+    f()
+except UnboundLocalError:
+    display("unbound")
+''', optimize, capsys)
+    assert output == "unbound\n"
+
+
+def test_dead_branch_without_scope_effects_is_removed(capsys):
+    output, report = run('''create f():
+    check no:
+        display("never")
+    display("always")
+
+f()
+''', True, capsys)
+    assert output == "always\n"
+    assert report == ["Line 2: condition is always no, removed the dead `check` branch"]
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_rebound_conversion_is_not_folded(optimize, capsys):
+    output, report = run('''create whole(value):
+    giveback 42
+
+display(whole("5"))
+''', optimize, capsys)
+    assert output == "42\n"
+    assert report == []
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_rebound_python_name_is_not_folded(optimize, capsys):
+    output, report = run('''int = text
+display(whole(5) + "!")
+''', optimize, capsys)
+    assert output == "5!\n"
+    assert report == []
+
+
+def test_conversion_is_folded(capsys):
+    output, report = run('display(whole("5") + 1)', True, capsys)
+    assert output == "6\n"
+    assert report == ["Line 1: folded `int('5')` into `5`", "Line 1: folded `5 + 1` into `6`"]
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_traceback_keeps_simpy_line_numbers(optimize):
+    code, report = compile_simpy_code('''limit = whole("10") * 2
+check no:
+    display("never")
+loopwhile no:
+    display("never")
+share = limit / (whole("3") - 3)
+''', optimize)
+    assert bool(report) == optimize
+    with pytest.raises(ZeroDivisionError) as error:
+        execute_simpy_code(code, {})
+    assert traceback.extract_tb(error.tb)[-1].lineno == 6
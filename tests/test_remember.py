@@ -0,0 +1,52 @@
+# tests/test_remember.py
+#
+# `remember create` functions: results are cached, recursion is as deep as
+# with plain functools.lru_cache, and an unhashable argument is reported
+# against the remember function it was passed to. Run with:
+#   python -m pytest tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import compile_simpy_code, execute_simpy_code
+
+fib_program = '''remember create fib(n):
+    check n less 2:
+        giveback n
+    giveback fib(n - 1) + fib(n - 2)
+'''
+
+
+def run(simpy_code):
+    code, _ = compile_simpy_code(simpy_code)
+    program_globals = {}
+    execute_simpy_code(code, program_globals)
+    return program_globals
+
+
+def test_deep_recursion():
+    program_globals = run(fib_program + 'result = fib(400)\n')
+    a, b = 0, 1
+    for _ in range(400):
+        a, b = b, a + b
+    assert program_globals['result'] == a
+    assert program_globals['fib'].stats().misses == 401
+
+
+def test_unhashable_argument_names_the_function():
+    with pytest.raises(TypeError, match=r"fib\(\) is a `remember` function.*a list"):
+        run(fib_program + 'create score(values):\n    giveback fib(values)\nscore([1, 2])\n')
+
+
+@pytest.mark.parametrize('line', [
+    's = set([[1]])',
+    'fib(set([[1]]))',
+    'd = {[1]: fib(1)}',
+])
+def test_other_unhashable_errors_are_unchanged(line):
+    with pytest.raises(TypeError, match=r"^unhashable type: 'list'$"):
+        run(fib_program + line + '\n')
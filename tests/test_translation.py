@@ -0,0 +1,26 @@
+# tests/test_translation.py
+#
+# Keyword translation: keywords are replaced in code, but not inside string
+# literals or as attribute names. Run with:  python -m pytest tests
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import translate_simpy_to_python
+
+
+@pytest.mark.parametrize('simpy_code, python_code', [
+    ('check x inside items: display("yes")', 'if x in items: print("yes")'),
+    ('writeall("inside.txt", series(3))', 'writeall("inside.txt", range(3))'),
+    ("display('select the total')", "print('select the total')"),
+    ('x = """check\nselect"""', 'x = """check\nselect"""'),
+    ('df.apply(f) + apply(f, values)', 'df.apply(f) + map(f, values)'),
+    ('display(f"{x inside y} {{inside}}")', 'print(f"{x in y} {{inside}}")'),
+    ('rows = array(select(valid, apply(parse, lines)))', 'rows = list(filter(valid, map(parse, lines)))'),
+])
+def test_translation(simpy_code, python_code):
+    assert translate_simpy_to_python(simpy_code) == python_code